@@ -4,12 +4,20 @@ import argparse
 import os
 import sys
 from yamlreader import yaml_load
+import requests
 import spotipy
 import spotipy_util as util
-import copy
 import pickle
+import sqlite3
 from pathlib import Path
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 def myArgparse():
     """
@@ -41,11 +49,11 @@ def myArgparse():
 
 def find_configfiles(configfile=None):
     """
-    Search for a config at the pre-defined and provided locations and return a list containing pathlib.PosixPath objects
-    for files found.
+    Search for a config at the provided and pre-defined locations (in this order) and return a list containing the
+    first file found.
 
     :param configfile: string with config file location
-    :return: list() containing strings of found config locations
+    :return: list() containing the string of the first found config location; empty if none was found
 
     >>> assert isinstance(find_configfiles(None), list)
     >>> tmp_config = tempfile.NamedTemporaryFile()
@@ -56,24 +64,22 @@ def find_configfiles(configfile=None):
     """
     # define list of possible locations
     config_locations = []
-    config_locations_found = []
 
     # if a configfile was provided and it exists, add it to the list as first element
     if configfile is not None:
-            config_locations.append(Path(configfile))
+        config_locations.append(configfile)
 
     # add a list of default locations to the list of possible locations
-    for config in ['~/.playlist_sync.yaml', os.path.dirname(sys.argv[0]) + '/playlist_sync.yaml',
-                   '/etc/playlist_sync.yaml']:
-        config_locations.append(config)
+    config_locations.extend(['~/.playlist_sync.yaml', os.path.dirname(sys.argv[0]) + '/playlist_sync.yaml',
+                             '/etc/playlist_sync.yaml'])
 
     # Return the first existing file
     for file in config_locations:
-        file_obj = Path(file)
-        if file_obj.is_file():
-            config_locations_found.append(str(file_obj.expanduser().absolute()))
+        file = os.path.expanduser(file)
+        if os.path.isfile(file):
+            return [os.path.abspath(file)]
 
-    return config_locations_found
+    return []
 
 
 def load_config(configfile=None):
@@ -82,32 +88,145 @@ def load_config(configfile=None):
     :param configfile: Path to a YAML file
     :return: yaml object
 
-    >>> defaults_file = Path(str(Path(__file__).parent) + '/conf/playlist_sync.defaults.yaml')
+    >>> defaults_file = Path(__file__).parent / 'conf' / 'playlist_sync.defaults.yaml'
     >>> assert defaults_file.is_file()
     >>> yaml = yaml_load(str(defaults_file.absolute()))
     >>> assert isinstance(yaml, dict)
     >>> assert isinstance(load_config(None), dict)
     >>> yaml = load_config(None)
     >>> for x in ['client_id', 'client_secret', 'redirect_url', 'data_dir']: assert x in yaml
+    >>> tmp_config = str(Path(tempfile.mkdtemp()) / 'playlist_sync.yaml')
+    >>> _ = Path(tmp_config).write_text('data_dir: /tmp/first')
+    >>> load_config(tmp_config)['data_dir']
+    '/tmp/first'
+    >>> _ = Path(tmp_config).write_text('data_dir: /tmp/second/longer')
+    >>> load_config(tmp_config)['data_dir']
+    '/tmp/second/longer'
+    >>> load_config(None)['data_dir']
+    '~/.playlist_sync'
     """
     # Load all defaults from this location first. Will be overwritten if set in provided user config file.
-    defaults_file = Path(str(Path(__file__).parent) + '/conf/playlist_sync.defaults.yaml')
-
-    # Load defaults
-    yaml = yaml_load(str(defaults_file.absolute()))
+    defaults_file = Path(__file__).parent / 'conf' / 'playlist_sync.defaults.yaml'
 
-    # Load user config
+    # Check user config
     if configfile is not None:
         if isinstance(configfile, str):
             if not Path(configfile).is_file():
                 print('WARNING: Config file {} was not found. Continue with default settings.'.format(configfile))
-            else:
-                yaml = yaml_load(configfile, yaml)
+                configfile = None
         else:
             raise ValueError('configfile needs to be of type str')
+
+    # Reuse the parsed config of a previous run if none of the files changed since. The cache is kept as a pickle
+    # file next to the defaults file.
+    cache_dir = str(defaults_file.parent.absolute())
+    cache_key = list()
+    for file in (str(defaults_file.absolute()), configfile):
+        if file is not None:
+            file_stat = os.stat(file)
+            cache_key.append((os.path.abspath(file), file_stat.st_mtime_ns, file_stat.st_size))
+
+    try:
+        cached = load_from_pickle('.config_cache', path=cache_dir)
+    except Exception:
+        # An unreadable cache is treated like a missing one
+        cached = None
+    if isinstance(cached, dict) and cached.get('key') == cache_key:
+        return cached['yaml']
+
+    # Load defaults
+    yaml = yaml_load(str(defaults_file.absolute()))
+
+    # Load user config
+    if configfile is not None:
+        yaml = yaml_load(configfile, yaml)
+
+    try:
+        store_to_pickle({'key': cache_key, 'yaml': yaml}, '.config_cache', path=cache_dir)
+    except OSError:
+        # Not writable; the config will just be parsed again next time
+        pass
     return yaml
 
 
+# One lock per (username, scope), so concurrent requests for the same token are not sent twice
+_tok_locks = dict()
+_tok_locks_lock = threading.Lock()
+
+
+def get_token(username, scope, client_id, client_secret, redirect_url, cache_path, direction='source',
+              interactive=True):
+    """
+    Returns a token for username and scope from util.prompt_for_user_token(), which keeps valid tokens in memory until
+    they expire. Concurrent callers asking for the same (username, scope) pair wait for the first one to finish, so
+    they get the token it fetched or refreshed instead of requesting another one.
+    :param username: str() defining the Spotify username
+    :param scope: str() defining the space separated scopes to request
+    :param client_id: str() containing the client ID of the app
+    :param client_secret: str() containing the client secret of the app
+    :param redirect_url: str() containing the redirect URL of the app
+    :param cache_path: str() defining where the token is cached on disk
+    :param direction: str() being 'source' or 'destination'; used for the login prompt only
+    :param interactive: bool() defining whether the user may be asked to login if no valid token is cached
+    :return: str() containing the access token; None if a login would be needed but interactive is False
+
+    >>> prompt_for_user_token = util.prompt_for_user_token
+    >>> calls = []
+    >>> util.prompt_for_user_token = lambda *args, **kwargs: calls.append(args[:2]) or 'token-' + args[0]
+    >>> try:
+    ...     tokens = [get_token('doctest-user', 'scope-a', 'id', 'secret', 'http://localhost/', '/tmp/.cache-doctest')
+    ...               for _ in range(2)]
+    ... finally:
+    ...     util.prompt_for_user_token = prompt_for_user_token
+    ...     _ = _tok_locks.pop(('doctest-user', 'scope-a'), None)
+    >>> tokens
+    ['token-doctest-user', 'token-doctest-user']
+    >>> calls
+    [('doctest-user', 'scope-a'), ('doctest-user', 'scope-a')]
+    """
+    key = (username, scope)
+    with _tok_locks_lock:
+        lock = _tok_locks.setdefault(key, threading.Lock())
+
+    with lock:
+        return util.prompt_for_user_token(username, scope, client_id, client_secret, redirect_url, cache_path,
+                                          direction, interactive=interactive)
+
+
+def _orjson_hook(response, *args, **kwargs):
+    """
+    requests response hook which makes response.json() decode the body with orjson.
+
+    >>> response = requests.Response()
+    >>> response._content = b'{"items": [{"id": "abc"}], "next": null}'
+    >>> response = _orjson_hook(response) if orjson is not None else response
+    >>> response.json()
+    {'items': [{'id': 'abc'}], 'next': None}
+    >>> response._content = b''
+    >>> try:
+    ...     response.json()
+    ... except ValueError:
+    ...     print('ValueError')
+    ValueError
+    """
+    response.json = lambda **_: orjson.loads(response.content)
+    return response
+
+
+def make_spotify(token):
+    """
+    Create a spotipy.Spotify object for the provided token. If orjson is installed, API responses are decoded with it,
+    which is considerably faster than the standard library on large paging objects.
+    :param token: str() containing the access token
+    :return: spotipy.Spotify object
+    """
+    sp = spotipy.Spotify(auth=token)
+    session = getattr(sp, '_session', None)
+    if orjson is not None and isinstance(session, requests.Session):
+        session.hooks['response'].append(_orjson_hook)
+    return sp
+
+
 def authorize(yaml=None, path='~/.playlist_sync'):
     """
     Authorize all accounts defined in 'sources' and 'destinations' for the appropriate scopes, needed for the
@@ -122,6 +241,28 @@ def authorize(yaml=None, path='~/.playlist_sync'):
     >>> auths = authorize(yaml)
     >>> for x in ['sources', 'destinations']: assert x in auths
     >>> for x in ['sources', 'destinations']: assert isinstance(auths[x], dict)
+    >>> prompt_for_user_token = util.prompt_for_user_token
+    >>> logins = []
+    >>> def stub_prompt(username, scope, *args, interactive=True):
+    ...     if username not in logins and username != 'doctest-src':
+    ...         if not interactive:
+    ...             return None
+    ...         logins.append(username)
+    ...         assert threading.current_thread() is threading.main_thread()
+    ...     return 'token-' + username
+    >>> util.prompt_for_user_token = stub_prompt
+    >>> yaml.update({'sources': {'src1': {'username': 'doctest-src'}, 'src2': {'username': 'doctest-new'}},
+    ...              'destinations': {'dst1': {'username': 'doctest-new'}}})
+    >>> try:
+    ...     auths = authorize(yaml, path=tempfile.mkdtemp())
+    ... finally:
+    ...     util.prompt_for_user_token = prompt_for_user_token
+    ...     for key in [key for key in _tok_locks if key[0].startswith('doctest-')]:
+    ...         del _tok_locks[key]
+    >>> sorted(auths['sources']), sorted(auths['destinations'])
+    (['doctest-new', 'doctest-src'], ['doctest-new'])
+    >>> logins
+    ['doctest-new']
     """
     # Authorization Code Flow
     # http://spotipy.readthedocs.io/en/latest/#authorization-code-flow
@@ -138,30 +279,76 @@ def authorize(yaml=None, path='~/.playlist_sync'):
     write_scope = 'playlist-modify-private playlist-modify-public user-library-modify user-follow-modify'
     write_scope = ' '.join([write_scope, read_scope])
 
-    if 'sources' in yaml:
-        for account in yaml['sources']:
-            username        = yaml['sources'][account]['username']
-            cache_path      = Path(path).expanduser().absolute().joinpath(username)
-            cache_path.mkdir(parents=True, exist_ok=True)
-            cache_path      = cache_path.joinpath('.cache-{}'.format(username))
-            read_token      = util.prompt_for_user_token(username, read_scope, c_id, c_secret,
-                                                         redirect_url, str(cache_path), 'source')
-            auths['sources'][username] = spotipy.Spotify(auth=read_token)
-
+    # Accounts which are a destination as well get the (wider) write scope as a source, too. Both share the same token
+    # cache file, so this way they need to be authorized only once.
+    dest_usernames = set()
     if 'destinations' in yaml:
-        for account in yaml['destinations']:
-            username        = yaml['destinations'][account]['username']
-            cache_path      = Path(path).expanduser().absolute().joinpath(username)
-            cache_path.mkdir(parents=True, exist_ok=True)
-            cache_path      = cache_path.joinpath('.cache-{}'.format(username))
-            write_token     = util.prompt_for_user_token(username, write_scope, c_id, c_secret,
-                                                         redirect_url, str(cache_path), 'destination')
-            auths['destinations'][username] = spotipy.Spotify(auth=write_token)
+        dest_usernames = {yaml['destinations'][account]['username'] for account in yaml['destinations']}
+
+    # Collect (tree, username, scope, cache path, direction) for every account
+    accounts = list()
+    for tree, direction in (('sources', 'source'), ('destinations', 'destination')):
+        if tree in yaml:
+            for account in yaml[tree]:
+                username        = yaml[tree][account]['username']
+                cache_path      = Path(path).expanduser().absolute().joinpath(username)
+                cache_path.mkdir(parents=True, exist_ok=True)
+                cache_path      = cache_path.joinpath('.cache-{}'.format(username))
+                if tree == 'destinations' or username in dest_usernames:
+                    scope = write_scope
+                else:
+                    scope = read_scope
+                accounts.append((tree, username, scope, str(cache_path), direction))
+
+    # Read (and refresh) the cached tokens in parallel. Accounts which need an interactive login are logged in one
+    # after another on the main thread afterwards, so Ctrl-C at the prompt can't leave a worker thread blocked.
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        tokens = list(executor.map(lambda a: get_token(a[1], a[2], c_id, c_secret, redirect_url, a[3], a[4],
+                                                       interactive=False), accounts))
+
+    for i, (_, username, scope, cache_path, direction) in enumerate(accounts):
+        if tokens[i] is None:
+            tokens[i] = get_token(username, scope, c_id, c_secret, redirect_url, cache_path, direction)
+
+    for (tree, username, _, _, _), token in zip(accounts, tokens):
+        auths[tree][username] = make_spotify(token)
 
     return auths
 
 
-def get_saved_tracks(auths=None, offset=0, limit=20):
+def get_all_pages(query, offset=0, limit=50, max_workers=5):
+    """
+    Fetches all pages of an offset-paginated Spotify endpoint. The first page is requested on its own to learn the
+    'total' count of objects; the remaining pages are then requested in parallel, since the work is bound by network
+    latency only. Rate limiting (HTTP 429 and its 'Retry-After' header) is already handled by spotipy's session.
+    :param query: callable taking the keyword arguments 'limit' and 'offset' and returning a Spotify paging object
+    :param offset: int() defining at which count of objects to start the query
+    :param limit: int() defining the max count of objects to return per query
+    :param max_workers: int() defining how many requests may be in flight at the same time
+    :return: list() containing the paging objects in the order of their offset
+
+    >>> def query(limit, offset):
+    ...     return {'total': 120, 'items': list(range(offset, min(offset + limit, 120)))}
+    >>> [page['items'][0] for page in get_all_pages(query, limit=50)]
+    [0, 50, 100]
+    >>> [item for page in get_all_pages(query, limit=50) for item in page['items']] == list(range(120))
+    True
+    >>> [page['items'][0] for page in get_all_pages(query, offset=30, limit=50)]
+    [30, 80]
+    >>> [len(page['items']) for page in get_all_pages(query, offset=100, limit=50)]
+    [20]
+    """
+    first = query(limit=limit, offset=offset)
+    offsets = range(offset + limit, first['total'], limit)
+    if not offsets:
+        return [first]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pages = list(executor.map(lambda page_offset: query(limit=limit, offset=page_offset), offsets))
+    return [first] + pages
+
+
+def get_saved_tracks(auths=None, offset=0, limit=50):
     """
     This function takes a dictionary, which needs to be the 'sources' tree from the auths object authorize() creates.
     It then extracts all tracks wich are stored in those user account's libraries and returns a list() containing that
@@ -174,30 +361,46 @@ def get_saved_tracks(auths=None, offset=0, limit=20):
     tracks = list()
 
     for username in auths:
-        new_tracks = {'next': 'foo'}
-        while new_tracks['next'] is not None:
-            new_tracks = auths[username].current_user_saved_tracks(limit=limit, offset=offset)
-            for element in new_tracks['items']:
-                tracks.append(element['track']['id'])
-            offset += limit
+        for new_tracks in get_all_pages(auths[username].current_user_saved_tracks, offset=offset, limit=limit):
+            tracks.extend(element['track']['id'] for element in new_tracks['items'])
     return tracks
 
 
 def add_saved_tracks(auths=None, tracks=(None,)):
     """
     This function adds all track IDs from list tracks to all accounts listed in the provided auths dictionary (must be
-    the 'destinations'-tree from authorize()).
+    the 'destinations'-tree from authorize()). Tracks already saved in an account are skipped.
     :param auths: 'destinations'-tree from authorize()
     :param tracks: list() containing track IDs
     :return: True
-    """
+
+    >>> class StubAuth:
+    ...     def __init__(self):
+    ...         self.added = []
+    ...     def current_user_saved_tracks(self, limit, offset):
+    ...         return {'total': 1, 'items': [{'track': {'id': 'saved'}}]}
+    ...     def current_user_saved_tracks_add(self, tracks):
+    ...         self.added.append(tracks)
+    >>> auth = StubAuth()
+    >>> new_ids = ['track{:03}'.format(i) for i in range(130)]
+    >>> add_saved_tracks({'user': auth}, ['saved', None] + new_ids + new_ids[:10])
+    True
+    >>> [len(batch) for batch in auth.added]
+    [50, 50, 30]
+    >>> [track for batch in auth.added for track in batch] == new_ids
+    True
+    """
+    track_ids = list(dict.fromkeys(track for track in tracks if track is not None))
+
     for username in auths:
-        for track in tracks:
-            if track is not None:
-                auths[username].current_user_saved_tracks_add([track])
+        # Only add what this account doesn't have yet
+        existing = set(get_saved_tracks({username: auths[username]}))
+        new_ids  = [track_id for track_id in track_ids if track_id not in existing]
+        for i in range(0, len(new_ids), 50):
+            auths[username].current_user_saved_tracks_add(new_ids[i:i + 50])
     return True
 
-def get_saved_playlists(auths=None, offset=0, limit=20):
+def get_saved_playlists(auths=None, offset=0, limit=50):
     """
     This function takes a dictionary, which needs to be the 'sources' tree from the auths object authorize() creates.
     It then extracts all playlists wich are stored in those user account's libraries and returns a list() containing
@@ -210,32 +413,11 @@ def get_saved_playlists(auths=None, offset=0, limit=20):
     pl = list()
 
     for username in auths:
-        new_pl = {'next': 'foo'}
-        while new_pl['next'] is not None:
-            new_pl = auths[username].current_user_playlists(limit=limit, offset=offset)
-            for element in new_pl['items']:
-                pl.append(copy.deepcopy(element))
-            offset += limit
+        for new_pl in get_all_pages(auths[username].current_user_playlists, offset=offset, limit=limit):
+            pl.extend(new_pl['items'])
     return pl
 
 
-def get_playlist_id(auth, username, playlist_name):
-    """
-    Extracts and returns an ID for the defined playlist name of the defined user.
-    :param auth: dict() of an auth object's tree ('sources' or 'destinations') as returned from authorize(), which
-        contains the defined username section.
-    :param username: str() defining which user the searched playlist belongs to
-    :param playlist_name: str() defining the name of the playlist
-    :return: str() containing the ID if found. Otherwise 'None'
-    """
-    my_playlists = get_saved_playlists(auth)
-    for my_pl in my_playlists:
-        if my_pl['owner']['id'] == username:
-            if my_pl['name'] == playlist_name:
-                return my_pl['id']
-    return None
-
-
 def get_playlist_tracks(auth, username, playlist_id):
     """
     Extracts and returns a list containing the IDs for the tracks stored in the defined playlist ID of the defined user.
@@ -244,10 +426,23 @@ def get_playlist_tracks(auth, username, playlist_id):
     :param username: str() defining which user the playlist belongs to
     :param playlist_id: str() defining the ID of the playlist
     :return: list() containing str() for all tracks added to the defined playlist
+
+    >>> class StubAuth:
+    ...     pages = [{'items': [{'track': {'id': 'a'}}, {'track': None}], 'next': 'page2'},
+    ...              {'items': [{'track': {'id': None}}, {'track': {'id': 'b'}}], 'next': None}]
+    ...     def user_playlist_tracks(self, username, playlist_id, fields=None, limit=100):
+    ...         return self.pages[0]
+    ...     def next(self, result):
+    ...         return self.pages[1]
+    >>> get_playlist_tracks(StubAuth(), 'user', 'playlist')
+    ['a', 'b']
     """
     pl_tracks = list()
-    for item in auth.user_playlist_tracks(username, playlist_id=playlist_id):
-        pl_tracks.append(item['track']['id'])
+
+    new_tracks = auth.user_playlist_tracks(username, playlist_id=playlist_id, fields='items.track.id,next', limit=100)
+    while new_tracks is not None:
+        pl_tracks.extend(item['track']['id'] for item in new_tracks['items'] if item['track'] and item['track']['id'])
+        new_tracks = auth.next(new_tracks) if new_tracks['next'] is not None else None
     return pl_tracks
 
 
@@ -267,50 +462,70 @@ def add_saved_playlists(auths=None, playlists=None):
                 auths['destinations'][username].user_playlist_follow_playlist(pl['owner']['id'], pl['id'])
             else:
                 # Create own PLs and add tracks to them
-                auths['destinations'][username].user_playlist_create(username, pl['name'], public=pl['public'])
+                new_pl      = auths['destinations'][username].user_playlist_create(username, pl['name'],
+                                                                                   public=pl['public'])
                 # Add tracks to it
-                new_id      = get_playlist_id(auths['destinations'], username, pl['name'])
-                track_list  = get_playlist_tracks(auths['sources'][username], username, pl['id'])
-                auths['destinations'][username].user_playlist_add_tracks(username, new_id, track_list)
+                new_id      = new_pl['id']
+                track_list  = get_playlist_tracks(auths['sources'][pl['owner']['id']], pl['owner']['id'], pl['id'])
+                for i in range(0, len(track_list), 100):
+                    auths['destinations'][username].user_playlist_add_tracks(username, new_id, track_list[i:i + 100])
     return True
 
 
-def get_saved_artists(auths=None, offset=0, limit=20):
+def get_saved_artists(auths=None, offset=0, limit=50):
     """
     Extracts and returns a list containing the IDs for all artists followed by any of the accounts defined in 'sources'.
     :param auths: dict() being the 'sources'-tree of the auth object as returned by authorize()
-    :param offset: int() defining at which count of objects to start the query
+    :param offset: unused; followed artists are paginated by cursor, so every account is read from its first artist
     :param limit: int() defining the max count of objects to return per query
     :return: list() containing str() of the artists IDs
+
+    >>> class StubAuth:
+    ...     def current_user_followed_artists(self, limit):
+    ...         return self.page(0, limit)
+    ...     def next(self, result):
+    ...         return self.page(*result['next'])
+    ...     def page(self, start, limit):
+    ...         end = min(start + limit, 120)
+    ...         return {'artists': {'items': [{'id': str(i)} for i in range(start, end)],
+    ...                             'next': (end, limit) if end < 120 else None}}
+    >>> artists = get_saved_artists({'user1': StubAuth(), 'user2': StubAuth()})
+    >>> len(artists), artists[:2], artists[119:121]
+    (240, ['0', '1'], ['119', '0'])
     """
     artists = list()
 
     for username in auths:
-        new_artists = {'artists': {'next': 'foo'}}
-        while new_artists['artists']['next'] is not None:
-            new_artists = auths[username].current_user_followed_artists(limit=limit, after=offset)
-            for element in new_artists['artists']['items']:
-                artists.append(element['id'])
-            offset += limit
+        new_artists = auths[username].current_user_followed_artists(limit=limit)
+        while new_artists is not None:
+            artists.extend(element['id'] for element in new_artists['artists']['items'])
+            if new_artists['artists']['next'] is not None:
+                new_artists = auths[username].next(new_artists['artists'])
+            else:
+                new_artists = None
 
     return artists
 
 
 def add_saved_artists(auths, artists):
     """
-    Adds/follows artists.
+    Adds/follows artists. Artists already followed by an account are skipped.
     :param auths: dict() being the 'destinations'-tree of the auth object as returned from authorize()
     :param artists: list() containing the artists IDs to add to the 'destinations' accounts
     :return: True
     """
+    artist_ids = list(dict.fromkeys(artist for artist in artists if artist is not None))
+
     for username in auths:
-        for artist in artists:
-            if artist is not None:
-                auths[username].user_follow_artists([artist])
+        # Only add what this account doesn't have yet
+        existing = set(get_saved_artists({username: auths[username]}))
+        new_ids  = [artist_id for artist_id in artist_ids if artist_id not in existing]
+        for i in range(0, len(new_ids), 50):
+            auths[username].user_follow_artists(new_ids[i:i + 50])
     return True
 
 
-def get_saved_albums(auths=None, offset=0, limit=20):
+def get_saved_albums(auths=None, offset=0, limit=50):
     """
     Extracts and returns a list containing the IDs for all albums followed by any of the accounts defined in 'sources'.
     :param auths: dict() being the 'sources'-tree of the auth object as returned by authorize()
@@ -321,27 +536,27 @@ def get_saved_albums(auths=None, offset=0, limit=20):
     albums = list()
 
     for username in auths:
-        new_albums = {'next': 'foo'}
-        while new_albums['next'] is not None:
-            new_albums = auths[username].current_user_saved_albums(limit=limit, offset=offset)
-            for element in new_albums['items']:
-                albums.append(element['album']['id'])
-            offset += limit
+        for new_albums in get_all_pages(auths[username].current_user_saved_albums, offset=offset, limit=limit):
+            albums.extend(element['album']['id'] for element in new_albums['items'])
 
     return albums
 
 
 def add_saved_albums(auths=None, albums=(None,)):
     """
-    Adds/follows albums.
+    Adds/follows albums. Albums already saved in an account are skipped.
     :param auths: dict() being the 'destinations'-tree of the auth object as returned from authorize()
     :param albums: list() containing the albums IDs to add to the 'destinations' accounts
     :return: True
     """
+    album_ids = list(dict.fromkeys(album for album in albums if album is not None))
+
     for username in auths:
-        for album in albums:
-            if album is not None:
-                auths[username].current_user_saved_albums_add([album])
+        # Only add what this account doesn't have yet
+        existing = set(get_saved_albums({username: auths[username]}))
+        new_ids  = [album_id for album_id in album_ids if album_id not in existing]
+        for i in range(0, len(new_ids), 50):
+            auths[username].current_user_saved_albums_add(new_ids[i:i + 50])
     return True
 
 def store_to_pickle(obj, object_name, path='~/.playlist_sync'):
@@ -357,7 +572,7 @@ def store_to_pickle(obj, object_name, path='~/.playlist_sync'):
 
     # Save the object
     with open('{}/{}.p'.format(str(f_path.expanduser().absolute()), str(object_name)), 'wb') as p_file:
-        pickle.dump(obj, p_file)
+        pickle.dump(obj, p_file, protocol=pickle.HIGHEST_PROTOCOL, fix_imports=False)
 
     return True
 
@@ -380,6 +595,113 @@ def load_from_pickle(object_name, path='~/.playlist_sync'):
         return None
 
 
+def store_ids(ids, object_name, path='~/.playlist_sync'):
+    """
+    Saves the IDs as file called object_name + '.txt' at path, one ID per line.
+    :param ids: list() containing str() IDs. None entries are skipped.
+    :param object_name: A string, describing the object. This is used as a filename for the ID file.
+    :param path: String or pathlib.PosixPath definind where to save the ID files
+    :return: True
+    """
+    # Create the data directory defined by path and store the location as a pathlib.PosixPath object
+    f_path = create_dir(path)
+
+    # Save the IDs
+    with open('{}/{}.txt'.format(str(f_path.expanduser().absolute()), str(object_name)), 'wb') as id_file:
+        id_file.write(''.join(obj_id + '\n' for obj_id in ids if obj_id is not None).encode('ascii'))
+
+    return True
+
+
+def load_ids(object_name, path='~/.playlist_sync'):
+    """
+    Loads the IDs which are expected to be stored as file called object_name + '.txt' in path.
+    :param object_name: A string, describing the object. This is used as a filename for the ID file.
+    :param path: String or pathlib.PosixPath definind where to load the ID files from
+    :return: list() containing str() IDs if that file is found. Otherwise the object from a pickle file called
+        object_name + '.p' in path as written by older versions, or None if that doesn't exist either.
+
+    >>> data_dir = tempfile.mkdtemp()
+    >>> store_ids(['4uLU6hMCjMI75M1A2tKUQC', None, '6rqhFgbbKwnb9MLmUQDhG6'], 'tracks', data_dir)
+    True
+    >>> load_ids('tracks', data_dir)
+    ['4uLU6hMCjMI75M1A2tKUQC', '6rqhFgbbKwnb9MLmUQDhG6']
+    >>> store_to_pickle(['0OdUWJ0sBjDrqHygGUXeCF'], 'albums', data_dir)
+    True
+    >>> load_ids('albums', data_dir)
+    ['0OdUWJ0sBjDrqHygGUXeCF']
+    >>> assert load_ids('artists', data_dir) is None
+    """
+    f_path = make_pathlib(path)
+
+    # Load the IDs
+    try:
+        with open('{}/{}.txt'.format(str(f_path.expanduser().absolute()), str(object_name)), 'rb') as id_file:
+            return id_file.read().decode('ascii').split()
+    except FileNotFoundError:
+        return load_from_pickle(object_name, path)
+
+
+def store_playlists(playlists, path='~/.playlist_sync'):
+    """
+    Saves the playlists into the SQLite database 'playlists.db' at path. Only the fields needed by
+    add_saved_playlists() are kept; an existing database is replaced.
+    :param playlists: list() containing playlist objects as returned from spotipy.current_user_playlists()
+    :param path: String or pathlib.PosixPath definind where to save the database
+    :return: True
+    """
+    # Create the data directory defined by path and store the location as a pathlib.PosixPath object
+    f_path = create_dir(path)
+
+    db = sqlite3.connect('{}/playlists.db'.format(str(f_path.expanduser().absolute())))
+    try:
+        with db:
+            db.execute('CREATE TABLE IF NOT EXISTS playlists '
+                       '(owner_id TEXT NOT NULL, playlist_id TEXT NOT NULL, name TEXT, public INTEGER)')
+            db.execute('DELETE FROM playlists')
+            db.executemany('INSERT INTO playlists VALUES (?, ?, ?, ?)',
+                           ((pl['owner']['id'], pl['id'], pl['name'], pl['public']) for pl in playlists))
+    finally:
+        db.close()
+
+    return True
+
+
+def load_playlists(path='~/.playlist_sync'):
+    """
+    Loads the playlists stored by store_playlists() from the SQLite database 'playlists.db' in path.
+    :param path: String or pathlib.PosixPath definind where to load the database from
+    :return: list() containing playlist dicts with the keys 'id', 'name', 'public' and 'owner' (which holds 'id') if
+        the database is found. Otherwise the playlists from 'playlists.p' in path as written by older versions, or
+        None if that doesn't exist either.
+
+    >>> data_dir = tempfile.mkdtemp()
+    >>> assert load_playlists(data_dir) is None
+    >>> store_playlists([{'owner': {'id': 'user'}, 'id': 'pl1', 'name': 'Mix', 'public': True, 'tracks': {}},
+    ...                  {'owner': {'id': 'other'}, 'id': 'pl2', 'name': 'Radio', 'public': None}], data_dir)
+    True
+    >>> playlists = load_playlists(data_dir)
+    >>> playlists[0]
+    {'owner': {'id': 'user'}, 'id': 'pl1', 'name': 'Mix', 'public': True}
+    >>> playlists[1]
+    {'owner': {'id': 'other'}, 'id': 'pl2', 'name': 'Radio', 'public': None}
+    """
+    f_path = make_pathlib(path)
+    db_file = Path('{}/playlists.db'.format(str(f_path.expanduser().absolute())))
+
+    if not db_file.is_file():
+        return load_from_pickle('playlists', path)
+
+    db = sqlite3.connect(str(db_file))
+    try:
+        rows = db.execute('SELECT owner_id, playlist_id, name, public FROM playlists ORDER BY rowid').fetchall()
+    finally:
+        db.close()
+
+    return [{'owner': {'id': owner_id}, 'id': playlist_id, 'name': name,
+             'public': None if public is None else bool(public)} for owner_id, playlist_id, name, public in rows]
+
+
 def make_pathlib(path):
     """
     Make an pathlib.PosixPath object from path argument
@@ -403,9 +725,10 @@ def create_dir(path):
     :return: pathlib.PosixPath
     """
     f_path = make_pathlib(path)
+    abs_path = f_path.expanduser().absolute()
 
-    if not f_path.expanduser().absolute().is_dir():
-        f_path.expanduser().absolute().mkdir(parents=True)
+    if not abs_path.is_dir():
+        abs_path.mkdir(parents=True)
 
     return f_path
 
@@ -415,7 +738,8 @@ def main():
     args = myArgparse()
 
     # try to load config file
-    config = load_config(find_configfiles(args.config)[0])
+    configfiles = find_configfiles(args.config)
+    config = load_config(configfiles[0] if configfiles else None)
     # Cleanup yaml from trees not needed
     if args.write_only:
         del config['sources']
@@ -426,12 +750,12 @@ def main():
     data_dir = config['data_dir']
     if os.environ.get('PS_DATA_DIR') is not None:
         data_dir = os.environ.get('PS_DATA_DIR')
+    data_dir = str(Path(data_dir).expanduser().absolute())
 
     # Start authorization
     auth = authorize(yaml=config, path=data_dir)
 
-    #store_to_pickle(obj=auth, object_name='auths',
-    #                path=str(Path(data_dir).expanduser().absolute()))
+    #store_to_pickle(obj=auth, object_name='auths', path=data_dir)
 
     # Collect data from sources
     if not args.write_only:
@@ -440,23 +764,22 @@ def main():
         albums    = get_saved_albums(auth['sources'])
         playlists = get_saved_playlists(auth['sources'])
 
-        # Save all 4 dictionaries into separate pickle files
-        store_to_pickle(obj=tracks, object_name='tracks',
-                        path=str(Path(data_dir).expanduser().absolute()))
-        store_to_pickle(obj=artists, object_name='artists',
-                        path=str(Path(data_dir).expanduser().absolute()))
-        store_to_pickle(obj=albums, object_name='albums',
-                        path=str(Path(data_dir).expanduser().absolute()))
-        store_to_pickle(obj=playlists, object_name='playlists',
-                        path=str(Path(data_dir).expanduser().absolute()))
+        # Save the 3 ID lists into separate text files and the playlists into a database
+        store_ids(ids=tracks, object_name='tracks', path=data_dir)
+        store_ids(ids=artists, object_name='artists', path=data_dir)
+        store_ids(ids=albums, object_name='albums', path=data_dir)
+        store_playlists(playlists=playlists, path=data_dir)
 
     # Write data to destinations
     if not args.read_only:
-        # Load all 4 dictionaries from its corresponding pickle file
-        tracks    = load_from_pickle('tracks', path=str(Path(data_dir).expanduser().absolute()))
-        artists   = load_from_pickle('artists', path=str(Path(data_dir).expanduser().absolute()))
-        albums    = load_from_pickle('albums', path=str(Path(data_dir).expanduser().absolute()))
-        playlists = load_from_pickle('playlists', path=str(Path(data_dir).expanduser().absolute()))
+        # Load the 3 ID lists and the playlists back from the data directory
+        tracks    = load_ids('tracks', path=data_dir)
+        artists   = load_ids('artists', path=data_dir)
+        albums    = load_ids('albums', path=data_dir)
+        playlists = load_playlists(path=data_dir)
+        if None in (tracks, artists, albums, playlists):
+            sys.exit('ERROR: No collected data found in {}. Run without --write-only first to read the '
+                     'sources.'.format(data_dir))
 
         add_saved_tracks(auth['destinations'], tracks)
         add_saved_artists(auth['destinations'], artists)
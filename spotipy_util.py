@@ -6,11 +6,21 @@ inkognito / private browsers to lower the risk to login to the wrong Spotify acc
 Also, the help output was clarified some.
 """
 
+import json
 import os
+import threading
 from spotipy import oauth2
 import spotipy
 import webbrowser
 
+# Only one interactive login may be in progress at a time, as it uses the terminal and a fresh browser session
+_login_lock = threading.Lock()
+
+# SpotifyOAuth objects and the last token info they returned, keyed by
+# (username, client_id, redirect_uri, scope, cache_path)
+_OAUTH_CACHE = {}
+_oauth_cache_lock = threading.Lock()
+
 class MozillaInkognito(webbrowser.Mozilla):
     remote_action = "-private-window"
 
@@ -20,35 +30,48 @@ class ChromeInkognito(webbrowser.Chrome):
 class OperaInkognito(webbrowser.Opera):
     remote_action = ",new-private-tab"
 
-def _inkognito_wrap_browsers(webbrowser_object):
+# Browsers to wrap, in order of preference, with their family and inkognito class. Only the first available browser
+# of each family is wrapped.
+_FAMILY_MAP = {
     # Opera, quite popular
-    for browser in ("opera",):
-        if browser in webbrowser_object._browsers:
-            webbrowser_object.register(browser, None, OperaInkognito(browser), update_tryorder=-1)
-            break
-
+    "opera": ("opera", OperaInkognito),
     # The Mozilla browsers
-    for browser in ("firefox", "iceweasel", "iceape", "seamonkey"):
-        if browser in webbrowser_object._browsers:
-            webbrowser_object.register(browser, None, MozillaInkognito(browser), update_tryorder=-1)
-            break
-
+    "firefox": ("mozilla", MozillaInkognito),
+    "iceweasel": ("mozilla", MozillaInkognito),
+    "iceape": ("mozilla", MozillaInkognito),
+    "seamonkey": ("mozilla", MozillaInkognito),
     # Google Chrome/Chromium browsers
-    for browser in ("google-chrome", "chrome", "chromium", "chromium-browser"):
-        if browser in webbrowser_object._browsers:
-            webbrowser_object.register(browser, None, ChromeInkognito(browser), update_tryorder=-1)
-            break
+    "google-chrome": ("chrome", ChromeInkognito),
+    "chrome": ("chrome", ChromeInkognito),
+    "chromium": ("chrome", ChromeInkognito),
+    "chromium-browser": ("chrome", ChromeInkognito),
+}
+
+# Set once the browsers have been wrapped, so it is done only once
+_WRAPPED = False
+
+def _inkognito_wrap_browsers(webbrowser_object):
+    global _WRAPPED
+    if _WRAPPED:
+        return
+
+    # webbrowser registers the available browsers lazily on first use
+    if webbrowser_object._tryorder is None:
+        webbrowser_object.register_standard_browsers()
+
+    seen_families = set()
+    for browser, (family, cls) in _FAMILY_MAP.items():
+        if family not in seen_families and browser in webbrowser_object._browsers:
+            webbrowser_object.register(browser, None, cls(browser), preferred=True)
+            seen_families.add(family)
 
     # Cleanup duplicates from webbrowser_object._tryorder
-    uniq_elements = []
-    for elem in webbrowser_object._tryorder:
-        if elem not in uniq_elements:
-            uniq_elements.append(elem)
-    webbrowser_object._tryorder = uniq_elements
+    webbrowser_object._tryorder = list(dict.fromkeys(webbrowser_object._tryorder))
+    _WRAPPED = True
 
 
 def prompt_for_user_token(username, scope=None, client_id=None, client_secret=None,
-                          redirect_uri=None, cache_path=None, direction='source'):
+                          redirect_uri=None, cache_path=None, direction='source', interactive=True):
     """ prompts the user to login if necessary and returns
         the user token suitable for use with the spotipy.Spotify 
         constructor
@@ -61,6 +84,10 @@ def prompt_for_user_token(username, scope=None, client_id=None, client_secret=No
          - client_secret - the client secret of your app
          - redirect_uri - the redirect URI of your app
          - cache_path - path to location to save tokens
+         - direction - 'source' or 'destination', shown in the
+           login prompt
+         - interactive - if False, None is returned instead of
+           asking the user to login when no valid token is cached
     """
 
     if not client_id:
@@ -87,76 +114,28 @@ def prompt_for_user_token(username, scope=None, client_id=None, client_secret=No
         raise spotipy.SpotifyException(550, -1, 'no credentials set')
 
     cache_path = cache_path or ".cache-" + username
-    sp_oauth = oauth2.SpotifyOAuth(client_id, client_secret, redirect_uri, 
-        scope=scope, cache_path=cache_path)
-
-    # try to get a valid token for this user, from the cache,
-    # if not in the cache, the create a new (this will send
-    # the user to a web page where they can authorize this app)
-
-    token_info = sp_oauth.get_cached_token()
-
-    if not token_info:
-        print(f'''
-            #####################################################
-            
-            Need to authenticate the Spotify user:
-                {username}
-            for login type: {direction.upper()}
-            
-            Login type SOURCE means, that we need to
-            authenticate for an account which will be used to
-            read collections and items from (READ only).
-            
-            Login type DESTINATION means, that we need to
-            authenticate for an account which will be used to
-            copy collections and items from the SOURCE
-            accounts TO (READ/WRITE).
-            
-            We will accuire the following permissions:
-            ''')
-
-        for s in scope.split():
-            print(f'               {s}')
-
-        print(f'''
-            Please login to Spotify as this user in the web
-            browser which just should have been opened.
-
-            Once you enter your credentials and give
-            authorization, you will be redirected to a url.
-            
-            IMPORTANT:
-            Even if the page is not displayed or indicates an
-            error (like "Could not be found" or similar), copy
-            the url you were directed to from your browser's
-            address bar and paste it to this shell to 
-            complete the authorization.
-            
-            !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
-            Please make sure to close the browser window after
-            you have copied the URL (and before pasting it to
-            this window) to make sure the next instances are
-            launched in a new private session.
-            !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
+    key = (username, client_id, redirect_uri, scope, cache_path)
+    with _oauth_cache_lock:
+        sp_oauth, token_info = _OAUTH_CACHE.get(key, (None, None))
 
-        ''')
-        auth_url = sp_oauth.get_authorize_url()
-        try:
-            _inkognito_wrap_browsers(webbrowser)
-            webbrowser.open(auth_url)
-            print("Opened %s in your browser" % auth_url)
-        except webbrowser.Error:
-            print("Please navigate here: %s" % auth_url)
-
-        print()
-        print()
-        response = input("Enter the URL you were redirected to: ")
-        print()
-        print() 
-
-        code = sp_oauth.parse_response_code(response)
-        token_info = sp_oauth.get_access_token(code)
+    if sp_oauth is None:
+        sp_oauth = oauth2.SpotifyOAuth(client_id, client_secret, redirect_uri, 
+            scope=scope, cache_path=cache_path)
+
+    # try to get a valid token for this user, from memory or
+    # the cache, if not in the cache, the create a new (this
+    # will send the user to a web page where they can
+    # authorize this app)
+
+    if not token_info or sp_oauth.is_token_expired(token_info):
+        token_info = _get_cached_token(sp_oauth, cache_path)
+
+    if not token_info and interactive:
+        with _login_lock:
+            token_info = _interactive_login(sp_oauth, username, scope, direction)
+
+    with _oauth_cache_lock:
+        _OAUTH_CACHE[key] = (sp_oauth, token_info)
 
     # Auth'ed API request
     if token_info:
@@ -164,4 +143,86 @@ def prompt_for_user_token(username, scope=None, client_id=None, client_secret=No
     else:
         return None
 
-_inkognito_wrap_browsers(webbrowser)
+
+def _get_cached_token(sp_oauth, cache_path):
+    """ returns the token info cached at cache_path like
+        sp_oauth.get_cached_token() does: None if there is none
+        or it lacks any of the scopes, refreshed if it expired
+
+        The small file is read in one unbuffered call, which
+        saves the BufferedReader setup of a regular open().
+    """
+    try:
+        with open(cache_path, 'rb', buffering=0) as f:
+            token_info = json.loads(f.readall())
+    except (OSError, ValueError):
+        return None
+
+    return sp_oauth.validate_token(token_info) if isinstance(token_info, dict) else None
+
+
+def _interactive_login(sp_oauth, username, scope, direction):
+    """ sends the user to the authorization page in a private
+        browser window and returns the token info obtained from
+        the URL the user pastes back
+    """
+    print(f'''
+        #####################################################
+        
+        Need to authenticate the Spotify user:
+            {username}
+        for login type: {direction.upper()}
+        
+        Login type SOURCE means, that we need to
+        authenticate for an account which will be used to
+        read collections and items from (READ only).
+        
+        Login type DESTINATION means, that we need to
+        authenticate for an account which will be used to
+        copy collections and items from the SOURCE
+        accounts TO (READ/WRITE).
+        
+        We will accuire the following permissions:
+        ''')
+
+    for s in scope.split():
+        print(f'               {s}')
+
+    print(f'''
+        Please login to Spotify as this user in the web
+        browser which just should have been opened.
+
+        Once you enter your credentials and give
+        authorization, you will be redirected to a url.
+        
+        IMPORTANT:
+        Even if the page is not displayed or indicates an
+        error (like "Could not be found" or similar), copy
+        the url you were directed to from your browser's
+        address bar and paste it to this shell to 
+        complete the authorization.
+        
+        !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
+        Please make sure to close the browser window after
+        you have copied the URL (and before pasting it to
+        this window) to make sure the next instances are
+        launched in a new private session.
+        !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
+
+    ''')
+    auth_url = sp_oauth.get_authorize_url()
+    try:
+        _inkognito_wrap_browsers(webbrowser)
+        webbrowser.open(auth_url)
+        print("Opened %s in your browser" % auth_url)
+    except webbrowser.Error:
+        print("Please navigate here: %s" % auth_url)
+
+    print()
+    print()
+    response = input("Enter the URL you were redirected to: ")
+    print()
+    print() 
+
+    code = sp_oauth.parse_response_code(response)
+    return sp_oauth.get_access_token(code)